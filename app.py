@@ -5,107 +5,549 @@ Adds exchange-switching to dodge the Binance 451 ban.
 """
 
 import os
+import ssl
 import math
-from flask import Flask, request, jsonify, abort
-import ccxt
-import pandas as pd
-import pandas_ta as ta
+import time
+import hashlib
+import secrets
+from functools import partial
+import asyncio
+import aiohttp
+import certifi
+import redis.asyncio as redis
+from cachetools import TLRUCache
+from quart import Quart, Response, request, jsonify, abort
+from quart.json.provider import DefaultJSONProvider
+from werkzeug.exceptions import HTTPException
+import ccxt.async_support as ccxt
+import numpy as np
+import orjson
+from numba import njit
 
 
 # ───────────────────────────────────────────────────────────────
 # Helpers
 # ───────────────────────────────────────────────────────────────
-def get_exchange(exchange_id: str = "binanceus") -> ccxt.Exchange:
+_EX_CACHE: dict[str, ccxt.Exchange] = {}
+_SESSION: aiohttp.ClientSession | None = None
+
+
+def http_session() -> aiohttp.ClientSession:
+    """
+    The worker's aiohttp session, shared by every exchange instance.
+
+    One pool of keep-alive connections per worker means a cache miss
+    reuses a warm TLS connection instead of paying a new handshake.
+    """
+    global _SESSION
+    if _SESSION is None:
+        _SESSION = aiohttp.ClientSession(connector=aiohttp.TCPConnector(
+            limit=100,
+            keepalive_timeout=60,
+            ssl=ssl.create_default_context(cafile=certifi.where()),
+        ))
+    return _SESSION
+
+
+async def get_exchange(exchange_id: str = "binanceus") -> ccxt.Exchange:
     """
-    Build a ccxt exchange instance.
+    Return the worker's ccxt exchange instance, building it on first use.
 
     Defaults to 'binanceus' so it works from U-S IPs.
     Any ccxt-supported id (kucoin, bybit, okx, …) is accepted.
+    Instances hold an aiohttp session bound to the worker's event loop,
+    so they are reused across requests and closed on shutdown.
+    Markets are loaded here, once, rather than inside the first fetch.
+    """
+    ex = _EX_CACHE.get(exchange_id)
+    if ex is None:
+        if exchange_id not in ccxt.exchanges:
+            abort(400, description=f"Unsupported exchange '{exchange_id}'")
+        ex = _EX_CACHE[exchange_id] = getattr(ccxt, exchange_id)({
+            "enableRateLimit": False,        # see upstream_wait(): 429 instead of sleeping
+            "session":         http_session(),
+        })
+    if not ex.markets:
+        await ex.load_markets()          # concurrent callers share one load
+    return ex
+
+
+# Candles are cached per (exchange, pair, timeframe, limit) for one bar,
+# capped at OHLCV_TTL_CAP seconds so the last (open) candle stays fresh.
+# Entries are (candles, ttl): ttl is counted from the upstream fetch, so a
+# copy taken from the shared cache only lives for what is left of it there.
+OHLCV_TTL_CAP = 30
+
+def _ohlcv_ttl(tf: str) -> float:
+    return min(ccxt.Exchange.parse_timeframe(tf), OHLCV_TTL_CAP)
+
+def _ohlcv_ttu(_key, value: tuple, now: float) -> float:
+    return now + value[1]
+
+_OHLCV_CACHE = TLRUCache(maxsize=1024, ttu=_ohlcv_ttu)
+_OHLCV_INFLIGHT: dict[tuple, asyncio.Task] = {}
+
+
+# With REDIS_URL set, workers also share candles through Redis, so a bar
+# costs one upstream fetch per deployment rather than one per worker.
+# A SET NX lock lets one worker fetch while the others poll for its result.
+REDIS_URL         = os.getenv("REDIS_URL")
+SHARED_LOCK_MS    = 5000
+SHARED_POLL_S     = 0.05
+SHARED_POLLS      = 40
+_REDIS = redis.from_url(REDIS_URL) if REDIS_URL else None
+
+# Release a lock only if it still holds our token: after SHARED_LOCK_MS it
+# may have expired and been taken by another worker.
+_REDIS_UNLOCK = """
+if redis.call('GET', KEYS[1]) == ARGV[1] then
+    return redis.call('DEL', KEYS[1])
+end
+return 0
+"""
+
+
+def _redis_key(key: tuple) -> str:
+    return "ohlcv:%s:%s:%s:%d" % key
+
+
+async def _fetch_ohlcv(ex: ccxt.Exchange, key: tuple) -> np.ndarray:
+    if _REDIS is not None:
+        arr, ttl = await _fetch_shared(ex, key)
+    else:
+        arr, ttl = await _fetch_upstream(ex, key), _ohlcv_ttl(key[2])
+    _OHLCV_CACHE[key] = (arr, ttl)
+    return arr
+
+
+async def _fetch_shared(ex: ccxt.Exchange, key: tuple) -> tuple[np.ndarray, float]:
+    """Candles and their remaining TTL, from Redis or (under its lock) upstream."""
+    rkey  = _redis_key(key)
+    lock  = rkey + ":lock"
+    token = secrets.token_hex(16)
+    ttl   = _ohlcv_ttl(key[2])
+    try:
+        for _ in range(SHARED_POLLS):
+            blob, pttl = await _REDIS.pipeline(transaction=True).get(rkey).pttl(rkey).execute()
+            if blob is not None:
+                return (np.frombuffer(blob, dtype=np.float64).reshape(-1, 6),
+                        max(pttl, 0) / 1000)
+            if await _REDIS.set(lock, token, nx=True, px=SHARED_LOCK_MS):
+                break
+            await asyncio.sleep(SHARED_POLL_S)
+        else:
+            lock = None                      # holder is slow or gone: fetch without it
+    except redis.RedisError as err:
+        app.logger.warning("shared cache unavailable: %s", err)
+        return await _fetch_upstream(ex, key), ttl
+
+    try:
+        arr = await _fetch_upstream(ex, key)
+        await _REDIS.set(rkey, arr.tobytes(), px=int(ttl * 1000))
+    except redis.RedisError as err:
+        app.logger.warning("shared cache unavailable: %s", err)
+    finally:
+        if lock is not None:
+            try:
+                await _REDIS.eval(_REDIS_UNLOCK, 1, lock, token)
+            except redis.RedisError:
+                pass                         # expires on its own
+    return arr, ttl
+
+
+# Upstream calls are rate limited to the exchange's documented pace
+# (1000 / ex.rateLimit per second), bursting to at least MAX_PAIRS so a
+# full batch fits. Requests are charged up front for the fetches they will
+# cause; over budget we answer 429 with Retry-After instead of letting
+# ccxt sleep. With Redis the bucket is shared by all workers; otherwise
+# each worker keeps its own.
+class TokenBucket:
+    """`rate` tokens per second, bursting up to `capacity`."""
+
+    def __init__(self, rate: float, capacity: float):
+        self.rate, self.capacity = rate, capacity
+        self.tokens, self.stamp  = capacity, time.monotonic()
+
+    def consume(self, n: float = 1) -> float:
+        """Take `n` tokens; return 0, or the seconds until they would be available."""
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.stamp) * self.rate)
+        self.stamp  = now
+        if self.tokens < n:
+            return (n - self.tokens) / self.rate
+        self.tokens -= n
+        return 0.0
+
+
+# Same algorithm as TokenBucket.consume, atomically on a Redis hash. The
+# clock is Redis's own TIME, so workers on skewed hosts refill alike.
+_REDIS_BUCKET = """
+local rate, cap, n = tonumber(ARGV[1]), tonumber(ARGV[2]), tonumber(ARGV[3])
+local t = redis.call('TIME')
+local now = tonumber(t[1]) + tonumber(t[2]) / 1000000
+local b = redis.call('HMGET', KEYS[1], 'tokens', 'stamp')
+local tokens = math.min(cap, (tonumber(b[1]) or cap) + (now - (tonumber(b[2]) or now)) * rate)
+local wait = 0
+if tokens < n then wait = (n - tokens) / rate else tokens = tokens - n end
+redis.call('HSET', KEYS[1], 'tokens', tokens, 'stamp', now)
+redis.call('PEXPIRE', KEYS[1], math.ceil(cap / rate * 1000) + 1000)
+return tostring(wait)
+"""
+
+_BUCKETS: dict[str, TokenBucket] = {}
+
+
+async def upstream_wait(ex: ccxt.Exchange, n: int) -> float:
+    """Charge `n` upstream calls to `ex`'s budget; 0 if allowed, else seconds to wait."""
+    rps = 1000 / ex.rateLimit if ex.rateLimit else 10
+    cap = max(rps, MAX_PAIRS)
+    if _REDIS is not None:
+        try:
+            wait = await _REDIS.eval(_REDIS_BUCKET, 1, f"ratelimit:{ex.id}", rps, cap, n)
+            return float(wait)
+        except redis.RedisError as err:
+            app.logger.warning("shared rate limit unavailable: %s", err)
+    bucket = _BUCKETS.get(ex.id)
+    if bucket is None:
+        bucket = _BUCKETS[ex.id] = TokenBucket(rps, cap)
+    return bucket.consume(n)
+
+
+# Exchanges whose spot klines endpoint already returns ccxt's row layout
+# ([ts, o, h, l, c, v, …] with prices as strings), so `parse_ohlcv` can be skipped.
+RAW_KLINES = {"binance", "binanceus"}
+
+
+async def _fetch_upstream(ex: ccxt.Exchange, key: tuple) -> np.ndarray:
+    _, pair, tf, limit = key
+    market = ex.market(pair)
+    if ex.id in RAW_KLINES and market["spot"]:
+        rows = await ex.publicGetKlines({
+            "symbol":   market["id"],
+            "interval": ex.safe_string(ex.timeframes, tf, tf),
+            "limit":    limit,
+        })
+        # one C-level cast of the whole table instead of ccxt's per-row
+        # safe_integer / safe_number calls
+        arr = np.array(rows, dtype=object)[:, :6].astype(np.float64) if rows else np.empty((0, 6))
+    else:
+        arr = np.asarray(await ex.fetch_ohlcv(pair, tf, limit=limit), dtype=np.float64).reshape(-1, 6)
+    arr.flags.writeable = False                          # shared by every cache hit
+    return arr
+
+
+async def fetch_ohlcv_cached(ex: ccxt.Exchange, pair: str, tf: str, limit: int) -> np.ndarray:
+    """
+    OHLCV rows as an (N, 6) float64 array, behind the TTL cache and
+    single-flight on misses.
+
+    The first miss on a key starts one upstream fetch as a task; every
+    concurrent caller for that key awaits the same task. The task is
+    shielded so a disconnecting client does not cancel it for the others.
+    """
+    key = (ex.id, pair, tf, limit)
+    hit = _OHLCV_CACHE.get(key)
+    if hit is not None:
+        return hit[0]
+
+    task = _OHLCV_INFLIGHT.get(key)
+    if task is None:
+        task = _OHLCV_INFLIGHT[key] = asyncio.create_task(_fetch_ohlcv(ex, key))
+        task.add_done_callback(lambda _: _OHLCV_INFLIGHT.pop(key, None))
+    return await asyncio.shield(task)
+
+
+# ── Indicators ─────────────────────────────────────────────────
+# Column indices of a ccxt OHLCV row: [timestamp, open, high, low, close, volume]
+TS, O, H, L, C, V = range(6)
+
+# Wilder smoothing as pandas_ta does it: ewm(alpha=1/n, adjust=True),
+# i.e. the running sums num = num*(1 - 1/n) + x and den = den*(1 - 1/n) + 1,
+# read once at the last bar. RSI and ATR share one compiled pass.
+@njit(cache=True)
+def rsi_atr_last(high: np.ndarray, low: np.ndarray, close: np.ndarray,
+                 n: int = 14) -> tuple[float, float]:
+    """
+    Last values of RSI(n) and ATR(n).
+
+    Both start at the second bar (the first has no previous close) and
+    are NaN until `n` bars of history are available.
+    """
+    if close.size - 1 < n:                               # min_periods=n
+        return np.nan, np.nan
+    a = 1.0 - 1.0 / n
+    gain = loss = tr_sum = den = 0.0                     # `den` cancels in the RSI ratio
+    for i in range(1, close.size):
+        pc = close[i - 1]
+        d  = close[i] - pc
+        gain   = gain * a + (d if d > 0.0 else 0.0)
+        loss   = loss * a + (-d if d < 0.0 else 0.0)
+        tr_sum = tr_sum * a + max(high[i] - low[i], abs(high[i] - pc), abs(low[i] - pc))
+        den    = den * a + 1.0
+    total = gain + loss
+    rsi = 100.0 * gain / total if total != 0.0 else np.nan
+    return rsi, tr_sum / den
+
+
+# Compile now, for the signature used per request (read-only column views
+# of a cached array), so the first request after boot skips the JIT.
+_warm = np.zeros((2, 6))
+_warm.flags.writeable = False
+rsi_atr_last(_warm[:, H], _warm[:, L], _warm[:, C], 1)
+del _warm
+
+
+# Candles fetched per request: enough that the history cut off by the
+# window weighs less than WARMUP_TOL in the Wilder averages, at least
+# MIN_CANDLES, and no more than the exchange returns in one call.
+WARMUP_TOL   = 1e-4
+MIN_CANDLES  = 50
+OHLCV_LIMITS: dict[str, int] = {
+    "binance":   1000,
+    "binanceus": 1000,
+    "bybit":     1000,
+    "kucoin":    1500,
+    "okx":        300,
+}
+
+
+def candle_limit(exch_id: str, lookback: int) -> int:
+    warmup = math.ceil(math.log(WARMUP_TOL) / math.log1p(-1.0 / lookback)) if lookback > 1 else 1
+    limit  = max(warmup + 1, MIN_CANDLES)                # +1: diffs need a previous close
+    return min(limit, OHLCV_LIMITS.get(exch_id, limit))
+
+
+# orjson writes NaN / Inf as null and NumPy scalars as plain numbers,
+# so payloads go out as-is, without a sanitising pass.
+_DUMP = partial(orjson.dumps, option=orjson.OPT_SERIALIZE_NUMPY)
+
+
+class OrjsonProvider(DefaultJSONProvider):
+    """`jsonify` / `get_json` backed by orjson."""
+
+    def dumps(self, obj, **_kwargs) -> str:
+        return _DUMP(obj).decode()
+
+    def loads(self, s, **_kwargs):
+        return orjson.loads(s)
+
+
+OB_LO_MUL, OB_HI_MUL = 1.01, 1.03       # placeholder order block: 1–3 % above the swing low
+
+
+def build_snapshot(arr: np.ndarray, exch_id: str, pair: str, tf: str, lookback: int) -> dict:
+    """
+    Turn an (N, 6) OHLCV array into the `/snapshot` response payload.
+
+    Raises ValueError when the exchange returned no candles.
     """
-    if not hasattr(ccxt, exchange_id):
-        abort(400, description=f"Unsupported exchange '{exchange_id}'")
-    return getattr(ccxt, exchange_id)({
-        "enableRateLimit": True,
-    })
+    if not len(arr):
+        raise ValueError(f"No candles returned for {pair} {tf}")
+    # ── Indicators ─────────────────────────────────────────────
+    high, low, close = arr[:, H], arr[:, L], arr[:, C]
+    rsi_val, atr_val = rsi_atr_last(high, low, close, lookback)
 
+    swing_high = high.max()
+    swing_low  = low.min()
+    last_close = close[-1]
+
+    bos = swing_high                                     # placeholder “break of structure”
 
-def finite_or_none(x: float | None):
-    return None if (x is None or (isinstance(x, float) and not math.isfinite(x))) else x
+    return {
+        "exchange":   exch_id,
+        "pair":       pair,
+        "interval":   tf,
+        "price":      round(last_close, 2),
+        "rsi":        round(rsi_val, 2),
+        "atr":        round(atr_val, 2),
+        "swingHigh":  round(swing_high, 2),
+        "swingLow":   round(swing_low, 2),
+        "bos":        round(bos, 2),
+        "orderBlock": "%.2f-%.2f" % (swing_low * OB_LO_MUL, swing_low * OB_HI_MUL),
+    }
 
 
 # ───────────────────────────────────────────────────────────────
-# Flask
+# Quart
 # ───────────────────────────────────────────────────────────────
-app = Flask(__name__)
+app = Quart(__name__)
+app.json = OrjsonProvider(app)
 DEFAULT_LOOKBACK  = int(os.getenv("LOOKBACK", 14))
 DEFAULT_EXCHANGE  = os.getenv("EXCHANGE", "binanceus")   # dodge 451 by default
 DEFAULT_INTERVAL  = os.getenv("INTERVAL", "1h")
 DEFAULT_PAIR      = os.getenv("PAIR", "BTC/USDT")
+MAX_PAIRS         = int(os.getenv("MAX_PAIRS", 50))
+HTTP_MAX_AGE      = int(os.getenv("HTTP_MAX_AGE", OHLCV_TTL_CAP))   # upper bound for Cache-Control
+WARM_EXCHANGES    = os.getenv("WARM_EXCHANGES", DEFAULT_EXCHANGE).lower().split(",")
+
+
+def cacheable_json(obj, tf: str) -> Response:
+    """
+    JSON response that proxies/CDNs may cache as long as the candles behind it.
+
+    max-age is min(timeframe, HTTP_MAX_AGE), which defaults to the candle
+    cache's OHLCV_TTL_CAP, so a cached price is never staler than the app's
+    own; the ETag lets clients revalidate with If-None-Match and get a 304.
+    """
+    body = _DUMP(obj)
+    etag = hashlib.blake2b(body, digest_size=16).hexdigest()
+    ttl  = min(int(ccxt.Exchange.parse_timeframe(tf)), HTTP_MAX_AGE)
+    headers = {"Cache-Control": f"public, max-age={ttl}", "Vary": "Accept-Encoding"}
+
+    if request.if_none_match.contains_weak(etag):
+        resp = Response(status=304, headers=headers)
+    else:
+        resp = Response(body, headers=headers, mimetype="application/json")
+    resp.set_etag(etag)
+    return resp
+
+
+@app.before_serving
+async def warm_exchanges():
+    """Load markets for the usual exchanges before the worker takes traffic."""
+    for exch_id in filter(None, map(str.strip, WARM_EXCHANGES)):
+        try:
+            await get_exchange(exch_id)
+        except Exception as err:             # a cold start must not block boot
+            app.logger.warning("could not warm %s: %s", exch_id, err)
+
+
+@app.after_serving
+async def close_exchanges():
+    global _SESSION
+    while _EX_CACHE:
+        _, ex = _EX_CACHE.popitem()
+        await ex.close()
+    if _SESSION is not None:                 # not owned by ccxt, so not closed above
+        await _SESSION.close()
+        _SESSION = None
+    if _REDIS is not None:
+        await _REDIS.aclose()
 
 
 @app.route("/")
-def index():
+async def index():
     return "Confluence Snapshot is live 🚀", 200
 
 
-@app.route("/snapshot", methods=["GET", "POST", "OPTIONS"])
-def snapshot():
-    if request.method == "OPTIONS":          # CORS pre-flight
-        return "", 204
+@app.route("/snapshot", methods=["OPTIONS"])
+async def snapshot_preflight():              # CORS pre-flight
+    return "", 204
+
+
+@app.get("/snapshot", provide_automatic_options=False)
+async def snapshot_get():
+    return await _snapshot(request.args)
+
 
-    if request.method == "GET":
-        params   = request.args
-    else:                                    # POST
-        params   = request.get_json(force=True, silent=True) or {}
+@app.post("/snapshot", provide_automatic_options=False)
+async def snapshot_post():
+    try:                                     # body is JSON whatever the Content-Type
+        params = orjson.loads(await request.get_data())
+    except orjson.JSONDecodeError:
+        params = None
+    return await _snapshot(params if isinstance(params, dict) else {})
 
+
+def _known_symbol(ex: ccxt.Exchange, pair: str) -> bool:
+    try:
+        ex.market(pair)                      # what _fetch_upstream resolves, offline
+    except ccxt.BadSymbol:
+        return False
+    return True
+
+
+async def charge_upstream(ex: ccxt.Exchange, pairs: list, tf: str, limit: int) -> None:
+    """
+    Charge the fetches this request will start; abort with 429 if they don't fit.
+
+    Unknown symbols fail with BadSymbol before any network call, so they
+    are not charged and cannot drain the budget for everyone else; nor are
+    candles another worker already put in the shared cache.
+    """
+    misses = {(ex.id, p, tf, limit) for p in pairs if _known_symbol(ex, p)}
+    misses = [k for k in misses if k not in _OHLCV_CACHE and k not in _OHLCV_INFLIGHT]
+    if misses and _REDIS is not None:
+        try:
+            pipe = _REDIS.pipeline(transaction=False)
+            for k in misses:
+                pipe.exists(_redis_key(k))
+            shared = await pipe.execute()
+            misses = [k for k, hit in zip(misses, shared) if not hit]
+        except redis.RedisError as err:
+            app.logger.warning("shared cache unavailable: %s", err)
+    if misses and (wait := await upstream_wait(ex, len(misses))):
+        abort(429, description=f"Upstream rate limit for '{ex.id}' reached, retry shortly",
+              retry_after=math.ceil(wait))
+
+
+async def _snapshot(params):
+    """Shared body of GET/POST `/snapshot`; `params` is the query string or JSON object."""
     pair      = params.get("pair",      DEFAULT_PAIR)
     tf        = params.get("interval") or params.get("timeframe") or DEFAULT_INTERVAL
     lookback  = int(params.get("lookback",  DEFAULT_LOOKBACK))
     exch_id   = params.get("exchange",  DEFAULT_EXCHANGE).lower()
+    pairs     = params.get("pairs")                  # list, or "A/B,C/D" on GET
 
+    if isinstance(pairs, str):
+        pairs = [p.strip() for p in pairs.split(",") if p.strip()]
     if not pair or not tf:
         abort(400, description="`pair` and `interval` are required")
+    if lookback < 1:
+        abort(400, description="`lookback` must be a positive integer")
+    if pairs is not None and not (isinstance(pairs, list) and 0 < len(pairs) <= MAX_PAIRS
+                                  and all(isinstance(p, str) and p for p in pairs)):
+        abort(400, description=f"`pairs` must be a list of 1–{MAX_PAIRS} symbol strings")
 
-    ex = get_exchange(exch_id)
+    limit = candle_limit(exch_id, lookback)
 
     # ── Fetch candles ──────────────────────────────────────────
     try:
-        candles = ex.fetch_ohlcv(pair, tf, limit=max(lookback * 5, 200))
+        ex = await get_exchange(exch_id)
+        if ex.timeframes and tf not in ex.timeframes:
+            abort(400, description=f"Unsupported interval '{tf}' for '{exch_id}'")
+        await charge_upstream(ex, pairs or [pair], tf, limit)
+        if pairs:
+            # the batch's budget is already charged, so every fetch goes
+            # out at once: one round-trip's latency for the whole batch
+            results = await asyncio.gather(
+                *(fetch_ohlcv_cached(ex, p, tf, limit) for p in pairs),
+                return_exceptions=True,
+            )
+        else:
+            candles = await fetch_ohlcv_cached(ex, pair, tf, limit)
+            payload = build_snapshot(candles, exch_id, pair, tf, lookback)
+    except HTTPException:
+        raise
+    except ccxt.RateLimitExceeded:
+        abort(429, description=f"'{exch_id}' is rate limiting us, retry shortly",
+              retry_after=1)
     except Exception as err:
         return jsonify({"error": str(err)}), 400
 
-    df = pd.DataFrame(candles, columns=["ts", "o", "h", "l", "c", "v"])
-
-    # ── Indicators ─────────────────────────────────────────────
-    rsi_val = ta.rsi(df["c"], length=lookback).iloc[-1]
-    atr_val = ta.atr(df["h"], df["l"], df["c"], length=lookback).iloc[-1]
-
-    swing_high = df["h"].max()
-    swing_low  = df["l"].min()
-
-    bos = swing_high                                     # placeholder “break of structure”
-    ob_low, ob_high = round(swing_low * 1.01, 2), round(swing_low * 1.03, 2)
-
-    payload = {
-        "exchange":   exch_id,
-        "pair":       pair,
-        "interval":   tf,
-        "price":      round(float(df['c'].iloc[-1]), 2),
-        "rsi":        round(float(rsi_val), 2),
-        "atr":        round(float(atr_val), 2),
-        "swingHigh":  round(float(swing_high), 2),
-        "swingLow":   round(float(swing_low), 2),
-        "bos":        round(float(bos), 2),
-        "orderBlock": f"{ob_low}-{ob_high}",
-    }
-
-    # clean NaN / Inf
-    payload = {k: finite_or_none(v) for k, v in payload.items()}
+    if pairs:
+        if any(isinstance(r, ccxt.RateLimitExceeded) for r in results):
+            abort(429, description=f"'{exch_id}' is rate limiting us, retry shortly",
+                  retry_after=1)
+        snapshots, failed = [], False
+        for p, r in zip(pairs, results):
+            if not isinstance(r, BaseException):
+                try:
+                    snapshots.append(build_snapshot(r, exch_id, p, tf, lookback))
+                    continue
+                except ValueError as err:            # empty upstream result
+                    r = err
+            snapshots.append({"pair": p, "error": str(r)})
+            failed = True
+        if failed:
+            return jsonify(snapshots)                # don't let caches pin a failure
+        return cacheable_json(snapshots, tf)
 
-    return jsonify(payload)
+    return cacheable_json(payload, tf)
 
 
 # ── Local dev entrypoint ───────────────────────────────────────
+# Production runs under Gunicorn + Uvicorn:  gunicorn -c gunicorn.conf.py app:app
 if __name__ == "__main__":
     port = int(os.getenv("PORT", 8000))
-    app.run(host="0.0.0.0", port=port, debug=True)
+    app.run(host="0.0.0.0", port=port)
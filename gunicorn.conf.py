@@ -0,0 +1,23 @@
+"""
+gunicorn.conf.py – production server settings for Confluence Snapshot.
+
+`/snapshot` spends nearly all of its time waiting on the exchange's HTTP
+API, so each worker process runs the ASGI app on a Uvicorn event loop and
+keeps many fetches in flight at once.
+Override any value through the environment (WEB_CONCURRENCY, KEEPALIVE, …).
+"""
+
+import multiprocessing
+import os
+
+# Bind to $PORT on a PaaS, or to a unix socket behind Nginx
+# (BIND=unix:/run/confluence/gunicorn.sock – see deploy/nginx.conf).
+bind         = os.getenv("BIND", f"0.0.0.0:{os.getenv('PORT', 8000)}")
+
+workers      = int(os.getenv("WEB_CONCURRENCY", multiprocessing.cpu_count() * 2 + 1))
+worker_class = "uvicorn_worker.UvicornWorker"
+keepalive    = int(os.getenv("KEEPALIVE", 5))
+timeout      = int(os.getenv("TIMEOUT", 30))
+
+accesslog    = "-"
+errorlog     = "-"
@@ -0,0 +1,58 @@
+"""
+Pure helpers: candle window sizing and the in-process token bucket.
+"""
+
+import math
+
+import pytest
+
+app = pytest.importorskip("app")
+
+
+@pytest.mark.parametrize("lookback, want", [(1, 50), (5, 50), (14, 126), (50, 457)])
+def test_candle_limit_uncapped(lookback, want):
+    assert app.candle_limit("someexchange", lookback) == want
+
+
+@pytest.mark.parametrize("lookback", [2, 14, 30, 100])
+def test_candle_limit_meets_warmup_tolerance(lookback):
+    limit = app.candle_limit("someexchange", lookback)
+    # limit - 1 price changes; history beyond them must weigh < WARMUP_TOL
+    assert (1 - 1 / lookback) ** (limit - 1) <= app.WARMUP_TOL
+
+
+def test_candle_limit_capped_per_exchange():
+    assert app.candle_limit("okx", 200) == app.OHLCV_LIMITS["okx"]
+    assert app.candle_limit("binance", 14) == 126
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(app.time, "monotonic", lambda: now[0])
+    return now
+
+
+def test_token_bucket_burst_then_refill(clock):
+    bucket = app.TokenBucket(rate=20, capacity=50)
+    assert bucket.consume(50) == 0.0
+    assert bucket.consume(1) == pytest.approx(1 / 20)        # empty: one token away
+
+    clock[0] += 0.5                                           # +10 tokens
+    assert bucket.consume(10) == 0.0
+    assert bucket.consume(5) == pytest.approx(5 / 20)
+
+
+def test_token_bucket_refill_is_capped(clock):
+    bucket = app.TokenBucket(rate=20, capacity=50)
+    bucket.consume(50)
+    clock[0] += 60                                            # far longer than a full refill
+    assert bucket.consume(50) == 0.0
+    assert bucket.consume(1) > 0.0
+
+
+def test_token_bucket_refusal_takes_nothing(clock):
+    bucket = app.TokenBucket(rate=20, capacity=50)
+    assert bucket.consume(60) == pytest.approx(10 / 20)      # more than it can ever hold
+    assert bucket.consume(50) == 0.0                          # still full
+    assert math.isclose(bucket.tokens, 0.0, abs_tol=1e-12)
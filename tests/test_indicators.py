@@ -0,0 +1,74 @@
+"""
+rsi_atr_last must match the pandas_ta values it replaced.
+"""
+
+import math
+
+import numpy as np
+import pytest
+
+app = pytest.importorskip("app")
+pd  = pytest.importorskip("pandas")
+ta  = pytest.importorskip("pandas_ta")
+
+H, L, C = app.H, app.L, app.C
+
+
+def make_ohlcv(rows: int, seed: int = 7) -> np.ndarray:
+    """Deterministic random-walk candles, read-only like the cached arrays."""
+    rng   = np.random.default_rng(seed)
+    close = 100.0 + np.cumsum(rng.normal(0.0, 1.0, rows))
+    open_ = np.concatenate(([close[0]], close[:-1]))
+    high  = np.maximum(open_, close) + rng.uniform(0.0, 0.5, rows)
+    low   = np.minimum(open_, close) - rng.uniform(0.0, 0.5, rows)
+    arr   = np.column_stack([np.arange(rows) * 60_000.0, open_, high, low, close,
+                             rng.uniform(1.0, 10.0, rows)])
+    arr.flags.writeable = False
+    return arr
+
+
+def reference(arr: np.ndarray, n: int) -> tuple[float, float]:
+    df  = pd.DataFrame(arr, columns=["ts", "o", "h", "l", "c", "v"])
+    rsi = ta.rsi(df["c"], length=n, talib=False)
+    atr = ta.atr(df["h"], df["l"], df["c"], length=n, talib=False)
+    # pandas_ta returns None instead of a series when len(input) < n
+    return (math.nan if rsi is None else float(rsi.iloc[-1]),
+            math.nan if atr is None else float(atr.iloc[-1]))
+
+
+def assert_same(got: float, want: float):
+    if math.isnan(want):
+        assert math.isnan(got)
+    else:
+        assert got == pytest.approx(want, rel=1e-9, abs=1e-9)
+
+
+@pytest.mark.parametrize("n", [1, 2, 5, 14, 30])
+@pytest.mark.parametrize("rows", [50, 126, 200])
+def test_matches_pandas_ta(rows, n):
+    arr = make_ohlcv(rows)
+    rsi, atr = app.rsi_atr_last(arr[:, H], arr[:, L], arr[:, C], n)
+    want_rsi, want_atr = reference(arr, n)
+    assert_same(rsi, want_rsi)
+    assert_same(atr, want_atr)
+
+
+@pytest.mark.parametrize("rows", [1, 10, 14, 15])
+def test_too_short_input(rows):
+    # n=14 needs 14 price changes, i.e. 15 bars, before either value exists
+    arr = make_ohlcv(rows)
+    rsi, atr = app.rsi_atr_last(arr[:, H], arr[:, L], arr[:, C], 14)
+    want_rsi, want_atr = reference(arr, 14)
+    assert_same(rsi, want_rsi)
+    assert_same(atr, want_atr)
+    assert math.isnan(rsi) == (rows < 15)
+
+
+def test_flat_prices():
+    arr = np.tile([0.0, 100.0, 100.0, 100.0, 100.0, 1.0], (60, 1))
+    arr.flags.writeable = False
+    rsi, atr = app.rsi_atr_last(arr[:, H], arr[:, L], arr[:, C], 14)
+    want_rsi, want_atr = reference(arr, 14)
+    assert math.isnan(rsi) and math.isnan(want_rsi)          # 0 / 0: no movement at all
+    assert atr == pytest.approx(want_atr, abs=1e-9)          # pandas_ta adds an epsilon
+    assert atr == 0.0